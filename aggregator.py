@@ -1,111 +1,161 @@
 """Aggregation of raw results into final output files."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Literal, Tuple
 
 from config import Config
-from file_utils import atomic_write_json, load_json, save_csv
+from file_utils import CsvStreamWriter, JsonArrayWriter, atomic_write_json, load_json
 
 
-def flatten_for_csv(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+# Worker threads used to read raw result files
+LOAD_WORKERS = 16
+
+# Raw files loaded per batch, bounding how many parsed records are in memory
+CHUNK_SIZE = 5000
+
+# CSV column -> path into the raw result record
+CSV_SCHEMA: List[Tuple[str, Tuple[str, ...]]] = [
+    # Basic info
+    ("company_name", ("result", "company_name")),
+    ("website", ("result", "website")),
+    ("linkedin_url", ("result", "linkedin_url")),
+
+    # Company Classification
+    ("company_type", ("result", "company_classification", "type")),
+    ("classification_details", ("result", "company_classification", "details")),
+
+    # Qualification — Legal
+    ("legal_status", ("result", "qualification", "legal_standing", "status")),
+    ("legal_details", ("result", "qualification", "legal_standing", "details")),
+
+    # Qualification — Game Portfolio
+    ("portfolio_status", ("result", "qualification", "game_portfolio", "status")),
+    ("game_portfolio_details", ("result", "qualification", "game_portfolio", "details")),
+    ("game_types", ("result", "qualification", "game_portfolio", "game_types_found")),
+
+    # Qualification — Overall
+    ("overall_qualified", ("result", "qualification", "overall_qualified")),
+
+    # Profile — Portfolio Size
+    ("total_games", ("result", "profile_data", "portfolio_size", "total_games")),
+    ("total_games_description", ("result", "profile_data", "portfolio_size", "total_games_description")),
+
+    # Profile — Release Frequency
+    ("games_last_2_years", ("result", "profile_data", "release_frequency", "games_last_2_years")),
+    ("release_frequency_description", ("result", "profile_data", "release_frequency", "description")),
+    ("recent_titles", ("result", "profile_data", "release_frequency", "recent_titles")),
+
+    # Profile — Company Size
+    ("employee_count", ("result", "profile_data", "company_size", "employee_count")),
+
+    # Profile — Revenue
+    ("revenue_usd", ("result", "profile_data", "revenue", "amount")),
+    ("revenue_details", ("result", "profile_data", "revenue", "details")),
+
+    # Profile — External Partnerships
+    ("works_with_external_studios", ("result", "profile_data", "external_partnerships", "works_with_external_studios")),
+    ("eu_based_studios", ("result", "profile_data", "external_partnerships", "eu_based_studios")),
+    ("external_partnerships_details", ("result", "profile_data", "external_partnerships", "details")),
+
+    # Profile — Funding
+    ("has_external_funding", ("result", "profile_data", "funding", "has_external_funding")),
+    ("funding_rounds", ("result", "profile_data", "funding", "funding_rounds")),
+    ("public_company", ("result", "profile_data", "funding", "public_company")),
+
+    # Profile — In-House Creative
+    ("has_art_team", ("result", "profile_data", "in_house_creative", "has_art_team")),
+    ("has_video_production", ("result", "profile_data", "in_house_creative", "has_video_production")),
+    ("art_team_size", ("result", "profile_data", "in_house_creative", "team_size_estimate")),
+    ("in_house_creative_evidence", ("result", "profile_data", "in_house_creative", "evidence")),
+
+    # Meta
+    ("processed_at", ("meta", "processed_at")),
+    ("processing_time_sec", ("meta", "processing_time_sec")),
+    ("web_searches_used", ("meta", "usage", "web_search_requests")),
+    ("input_tokens", ("meta", "usage", "input_tokens")),
+    ("output_tokens", ("meta", "usage", "output_tokens")),
+
+    # Notes
+    ("research_date", ("result", "research_date")),
+    ("research_notes", ("result", "research_notes")),
+    ("data_gaps", ("result", "data_gaps")),
+]
+
+# CSV header, in row order
+FIELDNAMES: List[str] = [col for col, _ in CSV_SCHEMA]
+
+# List-valued columns rendered as a comma-separated string
+JOINED_COLUMNS = frozenset({"game_types", "data_gaps"})
+
+
+# Compiled flatteners, keyed by schema
+_FLATTENERS: Dict[Tuple[Tuple[str, Tuple[str, ...]], ...], Callable[[Dict[str, Any]], Tuple[Any, ...]]] = {}
+
+
+def compile_flattener(
+    schema: List[Tuple[str, Tuple[str, ...]]],
+) -> Callable[[Dict[str, Any]], Tuple[Any, ...]]:
+    """
+    Build a flatten function specialized for a schema.
+
+    The schema is static, so instead of walking every path per row we
+    generate one function with each lookup chain inlined. A missing key or
+    a null/non-dict section along the path yields None.
+
+    Args:
+        schema: List of (column, path) entries describing the row.
+
+    Returns:
+        Function mapping a raw result dictionary to a row tuple, with
+        values in schema order.
+    """
+    key = tuple(schema)
+    fn = _FLATTENERS.get(key)
+    if fn is not None:
+        return fn
+
+    lines = ["def _flatten(r):"]
+    for i, (col, path) in enumerate(schema):
+        access = "r" + "".join(f"[{k!r}]" for k in path)
+        lines.append("    try:")
+        lines.append(f"        v{i} = {access}")
+        lines.append("    except (KeyError, TypeError):")
+        lines.append(f"        v{i} = None")
+        if col in JOINED_COLUMNS:
+            lines.append(f"    v{i} = ', '.join(v{i} or [])")
+    values = "".join(f"v{i}, " for i in range(len(schema)))
+    lines.append(f"    return ({values})")
+
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines), namespace)
+    fn = _FLATTENERS[key] = namespace["_flatten"]
+    return fn
+
+
+# Flattener for the standard CSV layout
+flatten_row = compile_flattener(CSV_SCHEMA)
+
+
+def _classify(data: Dict[str, Any]) -> Literal["error", "qualified", "disqualified"]:
     """
-    Flatten nested JSON to flat structure for CSV export.
+    Route a raw record to its output bucket.
 
     Args:
-        results: List of raw result dictionaries.
+        data: Raw result dictionary.
 
     Returns:
-        List of flattened row dictionaries.
+        "error", "qualified" or "disqualified".
     """
-    rows = []
-
-    for r in results:
-        result = r.get("result", {}) or {}
-        classification = result.get("company_classification", {}) or {}
-        qual = result.get("qualification", {}) or {}
-        profile = result.get("profile_data", {}) or {}
-        meta = r.get("meta", {}) or {}
-        usage = meta.get("usage", {}) or {}
-
-        legal = qual.get("legal_standing") or {}
-        game_portfolio = qual.get("game_portfolio") or {}
-        portfolio_size = profile.get("portfolio_size") or {}
-        release_frequency = profile.get("release_frequency") or {}
-        company_size = profile.get("company_size") or {}
-        revenue = profile.get("revenue") or {}
-        external_partnerships = profile.get("external_partnerships") or {}
-        funding = profile.get("funding") or {}
-        in_house_creative = profile.get("in_house_creative") or {}
-
-        row = {
-            # Basic info
-            "company_name": result.get("company_name"),
-            "website": result.get("website"),
-            "linkedin_url": result.get("linkedin_url"),
-
-            # Company Classification
-            "company_type": classification.get("type"),
-            "classification_details": classification.get("details"),
-
-            # Qualification — Legal
-            "legal_status": legal.get("status"),
-            "legal_details": legal.get("details"),
-
-            # Qualification — Game Portfolio
-            "portfolio_status": game_portfolio.get("status"),
-            "game_portfolio_details": game_portfolio.get("details"),
-            "game_types": ", ".join(game_portfolio.get("game_types_found", []) or []),
-
-            # Qualification — Overall
-            "overall_qualified": qual.get("overall_qualified"),
-
-            # Profile — Portfolio Size
-            "total_games": portfolio_size.get("total_games"),
-            "total_games_description": portfolio_size.get("total_games_description"),
-
-            # Profile — Release Frequency
-            "games_last_2_years": release_frequency.get("games_last_2_years"),
-            "release_frequency_description": release_frequency.get("description"),
-            "recent_titles": release_frequency.get("recent_titles"),
-
-            # Profile — Company Size
-            "employee_count": company_size.get("employee_count"),
-
-            # Profile — Revenue
-            "revenue_usd": revenue.get("amount"),
-            "revenue_details": revenue.get("details"),
-
-            # Profile — External Partnerships
-            "works_with_external_studios": external_partnerships.get("works_with_external_studios"),
-            "eu_based_studios": external_partnerships.get("eu_based_studios"),
-            "external_partnerships_details": external_partnerships.get("details"),
-
-            # Profile — Funding
-            "has_external_funding": funding.get("has_external_funding"),
-            "funding_rounds": funding.get("funding_rounds"),
-            "public_company": funding.get("public_company"),
-
-            # Profile — In-House Creative
-            "has_art_team": in_house_creative.get("has_art_team"),
-            "has_video_production": in_house_creative.get("has_video_production"),
-            "art_team_size": in_house_creative.get("team_size_estimate"),
-            "in_house_creative_evidence": in_house_creative.get("evidence"),
-
-            # Meta
-            "processed_at": meta.get("processed_at"),
-            "processing_time_sec": meta.get("processing_time_sec"),
-            "web_searches_used": usage.get("web_search_requests"),
-            "input_tokens": usage.get("input_tokens"),
-            "output_tokens": usage.get("output_tokens"),
-
-            # Notes
-            "research_date": result.get("research_date"),
-            "research_notes": result.get("research_notes"),
-            "data_gaps": ", ".join(result.get("data_gaps", []) or []),
-        }
-        rows.append(row)
-
-    return rows
+    if data.get("error"):
+        return "error"
+    result = data.get("result")
+    qual = result.get("qualification") if result else None
+    if qual and qual.get("overall_qualified"):
+        return "qualified"
+    return "disqualified"
 
 
 def aggregate_results(config: Config) -> Dict[str, Any]:
@@ -121,81 +171,79 @@ def aggregate_results(config: Config) -> Dict[str, Any]:
     raw_dir = config.raw_output_dir
     output_dir = config.output_dir
 
-    all_results: List[Dict] = []
-    qualified: List[Dict] = []
-    disqualified: List[Dict] = []
+    total = 0
     errors: List[Dict] = []
 
-    # Load all JSON files from raw directory
-    for json_file in raw_dir.glob("*.json"):
-        # Skip index and error files
-        if json_file.name.startswith("_"):
-            continue
-
-        data = load_json(json_file)
-        if not data:
-            continue
-
-        all_results.append(data)
-
-        # Check for errors
-        if data.get("error"):
-            errors.append(data)
-            continue
-
-        # Classify by qualification status
-        result = data.get("result", {})
-        is_qualified = (
-            result.get("qualification", {}).get("overall_qualified", False)
-            if result else False
-        )
-
-        if is_qualified:
-            qualified.append(data)
-        else:
-            disqualified.append(data)
-
-    # Save JSON files
-    atomic_write_json(output_dir / "full_results.json", all_results)
-    atomic_write_json(output_dir / "qualified.json", qualified)
-    atomic_write_json(output_dir / "disqualified.json", disqualified)
+    # Usage counters, accumulated in the same pass
+    total_searches = 0
+    total_input_tokens = 0
+    total_output_tokens = 0
+    total_cache_read = 0
 
+    # Stream JSON outputs and CSV rows as files are loaded; a CSV is only
+    # created once it receives its first row
+    full_json = JsonArrayWriter(output_dir / "full_results.json")
+    qualified_json = JsonArrayWriter(output_dir / "qualified.json")
+    disqualified_json = JsonArrayWriter(output_dir / "disqualified.json")
+    all_csv = CsvStreamWriter(output_dir / "all_results.csv", FIELDNAMES)
+    qualified_csv = CsvStreamWriter(output_dir / "qualified.csv", FIELDNAMES)
+
+    # Collect raw result files, skipping index and error files
+    with os.scandir(raw_dir) as entries:
+        paths = [
+            entry.path for entry in entries
+            if entry.name.endswith(".json") and not entry.name.startswith("_")
+        ]
+
+    # Load files on a thread pool (I/O bound), one chunk at a time;
+    # classification and writing stay on this thread, in file order
+    with full_json, qualified_json, disqualified_json, all_csv, qualified_csv, \
+            ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        path_iter = iter(paths)
+        while chunk := list(islice(path_iter, CHUNK_SIZE)):
+            for data in executor.map(load_json, chunk):
+                if not data:
+                    continue
+
+                total += 1
+                full_json.append(data)
+                row = flatten_row(data)
+                all_csv.writerow(row)
+
+                # Records that failed before the API answered have no usage
+                usage = (data.get("meta") or {}).get("usage")
+                if usage:
+                    total_searches += usage.get("web_search_requests", 0)
+                    total_input_tokens += usage.get("input_tokens", 0)
+                    total_output_tokens += usage.get("output_tokens", 0)
+                    total_cache_read += usage.get("cache_read_tokens", 0)
+
+                # Route to output bucket
+                status = _classify(data)
+                if status == "error":
+                    errors.append(data)
+                elif status == "qualified":
+                    qualified_json.append(data)
+                    qualified_csv.writerow(row)
+                else:
+                    disqualified_json.append(data)
+
+    qualified = qualified_json.count
+    disqualified = disqualified_json.count
+
+    # Errors are rare; they are kept in memory and written only if present
     if errors:
         atomic_write_json(output_dir / "errors.json", errors)
 
-    # Generate CSV for qualified companies
-    if qualified:
-        csv_rows = flatten_for_csv(qualified)
-        save_csv(output_dir / "qualified.csv", csv_rows)
-
-    # Generate CSV for all results
-    if all_results:
-        all_csv_rows = flatten_for_csv(all_results)
-        save_csv(output_dir / "all_results.csv", all_csv_rows)
-
     # Calculate statistics
-    total = len(all_results)
     stats = {
         "total": total,
-        "qualified": len(qualified),
-        "disqualified": len(disqualified),
+        "qualified": qualified,
+        "disqualified": disqualified,
         "errors": len(errors),
-        "qualification_rate": f"{len(qualified)/total*100:.1f}%" if total > 0 else "0%",
+        "qualification_rate": f"{qualified/total*100:.1f}%" if total > 0 else "0%",
     }
 
-    # Calculate usage statistics
-    total_searches = 0
-    total_input_tokens = 0
-    total_output_tokens = 0
-    total_cache_read = 0
-
-    for r in all_results:
-        usage = r.get("meta", {}).get("usage", {})
-        total_searches += usage.get("web_search_requests", 0)
-        total_input_tokens += usage.get("input_tokens", 0)
-        total_output_tokens += usage.get("output_tokens", 0)
-        total_cache_read += usage.get("cache_read_tokens", 0)
-
     stats["usage"] = {
         "total_web_searches": total_searches,
         "avg_searches_per_company": round(total_searches / total, 2) if total > 0 else 0,
@@ -2,6 +2,7 @@
 
 import os
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -10,6 +11,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@lru_cache(maxsize=4)
+def _read_prompt(path: Path, mtime_ns: int) -> str:
+    """Read a prompt file; cached on (path, mtime) across Config instances."""
+    return path.read_text(encoding="utf-8")
+
+
 @dataclass
 class Config:
     """Main configuration class."""
@@ -18,7 +25,7 @@ class Config:
     # model: str = "claude-haiku-4-5"
     model: str = "claude-sonnet-4-5"
     max_tokens: int = 8192
-    timeout: int = 180  # 3 min, due to web search
+    timeout: int = 600  # 10 min (the SDK default); web search + 8K tokens can run long
 
     # Rate Limiting
     web_search_rpm: int = 30
@@ -82,8 +89,11 @@ class Config:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def load_system_prompt(self) -> str:
-        """Load and return the system prompt."""
-        return self.system_prompt_file.read_text(encoding="utf-8")
+        """Load and return the system prompt (cached until the file changes)."""
+        return _read_prompt(
+            self.system_prompt_file,
+            self.system_prompt_file.stat().st_mtime_ns,
+        )
 
 
 # CSV column mapping (adapt to actual input structure)
@@ -2,11 +2,29 @@
 
 import csv
 import hashlib
+import io
 import json
+import math
+import os
 import re
 import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+# Characters not allowed in filenames
+_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+# Runs of whitespace/underscores
+_UNDERSCORE_RUNS = re.compile(r'[\s_]+')
+# Digit runs long enough to hold an integer orjson can't represent exactly
+# (below -2**63 takes 19 digits, above 2**64 - 1 takes 20)
+_LONG_DIGITS = re.compile(r'\d{19}')
+_LONG_DIGITS_B = re.compile(rb'\d{19}')
 
 
 def sanitize_filename(name: str) -> str:
@@ -20,9 +38,9 @@ def sanitize_filename(name: str) -> str:
         Safe filename string.
     """
     # Replace problematic characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', name)
+    sanitized = _INVALID_FILENAME_CHARS.sub('_', name)
     # Replace multiple spaces/underscores with single underscore
-    sanitized = re.sub(r'[\s_]+', '_', sanitized)
+    sanitized = _UNDERSCORE_RUNS.sub('_', sanitized)
     # Remove leading/trailing underscores and dots
     sanitized = sanitized.strip('_.')
     # Limit length
@@ -44,12 +62,116 @@ def generate_company_filename(name: str, website: Optional[str] = None) -> str:
         Filename without extension.
     """
     sanitized = sanitize_filename(name)
-    # Create hash from name + website for uniqueness
+    # Create hash from name + website for uniqueness.
+    # Only the first 4 digest bytes are hex-encoded; this is the same
+    # suffix as md5(...).hexdigest()[:8], so existing filenames still match.
     unique_str = f"{name}_{website or ''}"
-    hash_suffix = hashlib.md5(unique_str.encode()).hexdigest()[:8]
+    hash_suffix = hashlib.md5(unique_str.encode()).digest()[:4].hex()
     return f"{sanitized}_{hash_suffix}"
 
 
+def loads_json(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON text, using orjson when it is installed.
+
+    orjson is stricter than the stdlib parser (e.g. it rejects NaN), so
+    anything it refuses is retried with json.loads. It also silently
+    parses integers outside the 64-bit range as floats, so text with a run
+    of 19 or more digits goes straight to json.loads, which keeps them
+    exact.
+
+    Args:
+        data: JSON document as str or UTF-8 bytes.
+
+    Returns:
+        Parsed JSON data.
+
+    >>> loads_json('{"a": -9223372036854775809}')
+    {'a': -9223372036854775809}
+    """
+    if orjson is not None:
+        long_digits = _LONG_DIGITS_B if isinstance(data, bytes) else _LONG_DIGITS
+        if not long_digits.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+    return json.loads(data)
+
+
+def _has_non_finite(data: Any) -> bool:
+    """Whether data contains a NaN or infinite float anywhere."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        t = type(value)
+        if t is float:
+            if not math.isfinite(value):
+                return True
+        elif t is dict:
+            stack.extend(value.values())
+        elif t is list or t is tuple:
+            stack.extend(value)
+    return False
+
+
+def dumps_json(data: Any, indent: Optional[int] = 2) -> bytes:
+    """
+    Serialize data to UTF-8 JSON bytes, using orjson when it is installed.
+
+    Falls back to the stdlib for indents orjson doesn't support (anything
+    but 2 or None), for values it can't encode (e.g. ints over 64 bits) and
+    for data holding NaN or infinities, which orjson would write as null.
+    Without an indent the output is compact, as orjson emits it.
+
+    Output is not byte-identical to json.dumps: besides the compact
+    separators, orjson formats some floats differently (1e-05 is written
+    as 0.00001, 1e+16 as 1e16). The values parse back the same.
+
+    Args:
+        data: Data to serialize.
+        indent: JSON indentation level.
+
+    Returns:
+        Encoded JSON document.
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            payload = orjson.dumps(data, option=option)
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            # Non-finite floats come out as null; only then is a walk needed
+            if b'null' not in payload or not _has_non_finite(data):
+                return payload
+    separators = (',', ':') if indent is None else None
+    return json.dumps(
+        data, indent=indent, separators=separators, ensure_ascii=False
+    ).encode('utf-8')
+
+
+@lru_cache(maxsize=1)
+def _umask() -> int:
+    """The process umask (reading it means briefly setting it)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _open_temp_for(filepath: Path):
+    """Open a binary temp file next to filepath, for a later atomic rename."""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(
+        mode='wb',
+        dir=str(filepath.parent),
+        suffix='.tmp',
+        delete=False
+    )
+
+
 def atomic_write_json(filepath: Path, data: Any, indent: int = 2) -> None:
     """
     Atomically write JSON data to file.
@@ -62,24 +184,67 @@ def atomic_write_json(filepath: Path, data: Any, indent: int = 2) -> None:
         indent: JSON indentation level.
     """
     filepath = Path(filepath)
-    filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    # Serialize up front so the file gets a single write
+    payload = dumps_json(data, indent)
 
     # Write to temp file in same directory (for atomic rename)
-    with tempfile.NamedTemporaryFile(
-        mode='w',
-        encoding='utf-8',
-        dir=filepath.parent,
-        suffix='.tmp',
-        delete=False
-    ) as tmp_file:
-        json.dump(data, tmp_file, indent=indent, ensure_ascii=False)
+    with _open_temp_for(filepath) as tmp_file:
+        tmp_file.write(payload)
         tmp_path = Path(tmp_file.name)
 
-    # Atomic rename
-    tmp_path.rename(filepath)
+    # Atomic rename (os.replace also overwrites an existing file on Windows)
+    os.replace(tmp_path, filepath)
 
 
-def load_json(filepath: Path) -> Optional[Any]:
+class JsonArrayWriter:
+    """
+    Streams items into a JSON array file without holding them all in memory.
+
+    With the default indent this produces the same bytes as
+    atomic_write_json(filepath, items). Like it, a temp file is written and
+    only replaces the target on a clean exit.
+    """
+
+    def __init__(self, filepath: Path, indent: Optional[int] = 2):
+        self.filepath = Path(filepath)
+        self.indent = indent
+        self.count = 0
+        self._pad = b"\n" + b" " * indent if indent is not None else b""
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._file = _open_temp_for(self.filepath)
+        self._file.write(b"[")
+        return self
+
+    def append(self, item: Any) -> None:
+        """Serialize and write one array item."""
+        payload = dumps_json(item, self.indent)
+        if self.indent is not None:
+            # Nest the item one level in, as json.dumps would
+            payload = payload.replace(b"\n", self._pad)
+            sep = self._pad if self.count == 0 else b"," + self._pad
+        else:
+            sep = b"" if self.count == 0 else b","
+        self._file.write(sep + payload)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        tmp_path = Path(self._file.name)
+        if exc_type is not None:
+            self._file.close()
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        if self.count and self.indent is not None:
+            self._file.write(b"\n")
+        self._file.write(b"]")
+        self._file.close()
+        os.replace(tmp_path, self.filepath)
+
+
+def load_json(filepath: Union[str, Path]) -> Optional[Any]:
     """
     Load JSON from file.
 
@@ -89,34 +254,122 @@ def load_json(filepath: Path) -> Optional[Any]:
     Returns:
         Parsed JSON data or None if file doesn't exist.
     """
-    filepath = Path(filepath)
-    if not filepath.exists():
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
         return None
 
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return loads_json(data)
 
 
-def save_csv(filepath: Path, rows: List[Dict[str, Any]]) -> None:
+def append_ndjson(filepath: Path, record: Any) -> None:
     """
-    Save list of dicts to CSV file.
+    Append one record to a newline-delimited JSON log.
 
     Args:
-        filepath: Target CSV file.
-        rows: List of dictionaries with consistent keys.
+        filepath: Log file path.
+        record: JSON-serializable record.
+    """
+    with open(filepath, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def load_ndjson(filepath: Path) -> List[Any]:
     """
-    if not rows:
-        return
+    Load all records from a newline-delimited JSON log.
 
+    Unparseable lines (e.g. a partial last line after a crash) are skipped.
+    A log that doesn't end in a newline gets one appended, so the next
+    record isn't glued onto the torn line and lost with it.
+
+    Args:
+        filepath: Log file to load.
+
+    Returns:
+        List of records, empty if the file doesn't exist.
+    """
     filepath = Path(filepath)
-    filepath.parent.mkdir(parents=True, exist_ok=True)
+    if not filepath.exists():
+        return []
 
-    fieldnames = list(rows[0].keys())
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    if data and not data.endswith(b'\n'):
+        with open(filepath, 'ab') as f:
+            f.write(b'\n')
+
+    records = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(loads_json(line))
+        except ValueError:
+            continue
+    return records
 
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+
+class CsvStreamWriter:
+    """
+    Incrementally writes positional rows to a CSV file.
+
+    The file is only created (and the header written) when the first row
+    arrives, so nothing is written for an empty stream. Like
+    JsonArrayWriter, rows go to a temp file that only replaces the target
+    on a clean exit.
+    """
+
+    def __init__(self, filepath: Path, fieldnames: Sequence[str]):
+        self.filepath = Path(filepath)
+        self.fieldnames = fieldnames
+        self._file = None
+        self._writer = None
+
+    def _open(self) -> None:
+        """Create the temp file and write the header."""
+        self._file = io.TextIOWrapper(
+            _open_temp_for(self.filepath), encoding='utf-8', newline=''
+        )
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fieldnames)
+
+    def writerow(self, row: Sequence[Any]) -> None:
+        """Write a single row, opening the file on first use."""
+        if self._writer is None:
+            self._open()
+        self._writer.writerow(row)
+
+    def __enter__(self) -> "CsvStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._file is None:
+            return
+        tmp_path = Path(self._file.buffer.name)
+        self._file.close()
+        self._file = None
+        if exc_type is not None:
+            tmp_path.unlink(missing_ok=True)
+            return
+        # Temp files are created 0600; give the CSV the usual umask mode
+        os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, self.filepath)
+
+
+@lru_cache(maxsize=32)
+def _detect_dialect(filepath: str, mtime_ns: int) -> Type[csv.Dialect]:
+    """
+    Sniff the CSV dialect of a file from its first 4KB.
+
+    Cached on (path, mtime), so an unchanged file is only sniffed once.
+    """
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',\t|;')
+    except csv.Error:
+        return csv.excel  # fallback to comma
 
 
 def load_csv(filepath: Path) -> List[Dict[str, str]]:
@@ -133,33 +386,39 @@ def load_csv(filepath: Path) -> List[Dict[str, str]]:
     if not filepath.exists():
         return []
 
+    dialect = _detect_dialect(str(filepath), filepath.stat().st_mtime_ns)
     with open(filepath, 'r', encoding='utf-8-sig') as f:  # utf-8-sig handles BOM
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=',\t|;')
-        except csv.Error:
-            dialect = csv.excel  # fallback to comma
         reader = csv.DictReader(f, dialect=dialect)
         return list(reader)
 
 
 class IndexManager:
-    """Manages the _index.json file for tracking processed companies."""
+    """
+    Manages the index of processed companies.
+
+    New entries are appended to _index.ndjson, so each add costs one small
+    write instead of rewriting the whole index. compact() folds the log
+    back into _index.json.
+    """
 
     def __init__(self, raw_output_dir: Path):
         self.index_file = raw_output_dir / "_index.json"
+        self.log_file = raw_output_dir / "_index.ndjson"
         self._index: Dict[str, str] = {}
         self._load()
 
     def _load(self) -> None:
-        """Load index from file."""
+        """Load index snapshot and replay the append log."""
         data = load_json(self.index_file)
         self._index = data if isinstance(data, dict) else {}
+        for entry in load_ndjson(self.log_file):
+            if isinstance(entry, dict):
+                self._index.update(entry)
 
-    def save(self) -> None:
-        """Save index to file."""
+    def compact(self) -> None:
+        """Write the consolidated index to _index.json and clear the log."""
         atomic_write_json(self.index_file, self._index)
+        self.log_file.unlink(missing_ok=True)
 
     def is_processed(self, company_name: str) -> bool:
         """Check if company has been processed."""
@@ -168,7 +427,7 @@ class IndexManager:
     def add(self, company_name: str, filename: str) -> None:
         """Add company to index."""
         self._index[company_name] = filename
-        self.save()
+        append_ndjson(self.log_file, {company_name: filename})
 
     def get_filename(self, company_name: str) -> Optional[str]:
         """Get filename for a company."""
@@ -184,21 +443,40 @@ class IndexManager:
 
 
 class ErrorLogger:
-    """Manages the _errors.json file for tracking processing errors."""
+    """
+    Manages the log of processing errors.
+
+    New errors are appended to _errors.ndjson instead of rewriting the
+    whole _errors.json each time. compact() folds the log back into
+    _errors.json.
+    """
 
     def __init__(self, raw_output_dir: Path):
         self.error_file = raw_output_dir / "_errors.json"
+        self.log_file = raw_output_dir / "_errors.ndjson"
         self._errors: List[Dict[str, Any]] = []
         self._load()
 
     def _load(self) -> None:
-        """Load errors from file."""
+        """Load errors snapshot and append log."""
         data = load_json(self.error_file)
         self._errors = data if isinstance(data, list) else []
-
-    def save(self) -> None:
-        """Save errors to file."""
+        logged = [
+            entry for entry in load_ndjson(self.log_file)
+            if isinstance(entry, dict)
+        ]
+        # A crash between writing the snapshot and removing the log in
+        # compact() leaves the logged entries at the end of the snapshot
+        # too; finish that compaction instead of replaying them twice
+        if logged and self._errors[-len(logged):] == logged:
+            self.log_file.unlink(missing_ok=True)
+            return
+        self._errors.extend(logged)
+
+    def compact(self) -> None:
+        """Write all errors to _errors.json and clear the log."""
         atomic_write_json(self.error_file, self._errors)
+        self.log_file.unlink(missing_ok=True)
 
     def add(
         self,
@@ -209,14 +487,15 @@ class ErrorLogger:
         details: Optional[Dict] = None
     ) -> None:
         """Add error entry."""
-        self._errors.append({
+        entry = {
             "company_name": company_name,
             "error_type": error_type,
             "error_message": error_message,
             "timestamp": timestamp,
             "details": details or {}
-        })
-        self.save()
+        }
+        self._errors.append(entry)
+        append_ndjson(self.log_file, entry)
 
     def get_failed_companies(self) -> List[str]:
         """Get list of companies that failed processing."""
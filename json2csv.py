@@ -7,227 +7,346 @@ Reads all JSON files that don't start with "_" and flattens the structure.
 import json
 import csv
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
-
-
-def flatten_dict(d: dict, parent_key: str = '', sep: str = '.') -> dict:
-    """Recursively flatten a nested dictionary."""
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep).items())
-        elif isinstance(v, list):
-            # Convert lists to string representation
-            items.append((new_key, json.dumps(v, ensure_ascii=False) if v else ''))
-        else:
-            items.append((new_key, v))
-    return dict(items)
-
-
+from typing import Any, Callable, Optional
+
+from file_utils import atomic_write_json, load_json
+
+# Worker threads used to read result files
+LOAD_WORKERS = 16
+
+# Format of .flat_cache.json; bump whenever flatten_dict/flatten_record
+# output changes, so rows flattened by older code aren't reused
+FLAT_CACHE_VERSION = 2
+
+
+def flatten_dict(d: dict, out: Optional[dict] = None, sep: str = '.') -> dict:
+    """
+    Flatten a nested dictionary into a single dict with dotted keys.
+
+    Walks the structure with an explicit stack and writes straight into
+    `out`, instead of recursing and merging a new dict per nesting level.
+    """
+    if out is None:
+        out = {}
+
+    stack = [('', d)]
+    while stack:
+        parent_key, current = stack.pop()
+        for k, v in current.items():
+            new_key = f"{parent_key}{sep}{k}" if parent_key else k
+            t = type(v)
+            if t is dict:
+                stack.append((new_key, v))
+            elif t is list:
+                # Convert lists to string representation
+                out[new_key] = json.dumps(v, ensure_ascii=False) if v else ''
+            else:
+                out[new_key] = v
+    return out
+
+
+def normalize_value(v: Any) -> Any:
+    """Format a flat value for CSV: None -> '', booleans -> Yes/No."""
+    return '' if v is None else 'Yes' if v is True else 'No' if v is False else v
+
+
+def compile_row_projector(keys: list[str]) -> Callable[[dict], list]:
+    """
+    Build a function projecting a flat record onto `keys` as a CSV row.
+
+    The column order is fixed once the header is known, so instead of
+    looping over the keys per row we generate one function with every
+    lookup inlined. Missing keys come out as ''.
+    """
+    items = ", ".join(f"_n(r.get({k!r}))" for k in keys)
+    namespace: dict[str, Any] = {'_n': normalize_value}
+    exec(f"def _row(r):\n    return [{items}]", namespace)
+    return namespace['_row']
+
+
+# Readable CSV headers for known flattened keys
+_HEADER_MAPPING = {
+    # Meta fields
+    'meta.processed_at': 'Processed At',
+    'meta.model': 'AI Model',
+    'meta.processing_time_sec': 'Processing Time (sec)',
+    'meta.usage.input_tokens': 'Input Tokens',
+    'meta.usage.output_tokens': 'Output Tokens',
+    'meta.usage.cache_read_tokens': 'Cache Read Tokens',
+    'meta.usage.cache_creation_tokens': 'Cache Creation Tokens',
+    'meta.usage.web_search_requests': 'Web Search Requests',
+
+    # Input fields
+    'input.company_name': 'Input Company Name',
+    'input.': 'Input Extra',
+
+    # Result basic fields
+    'result.company_name': 'Company Name',
+    'result.website': 'Website',
+    'result.linkedin_url': 'LinkedIn URL',
+    'result.headquarters_country': 'Headquarters Country',
+    'result.research_date': 'Research Date',
+
+    # Classification
+    'result.company_classification.type': 'Company Type',
+    'result.company_classification.sub_type': 'Company Sub-Type',
+    'result.company_classification.details': 'Classification Details',
+    'result.company_classification.service_relevance': 'Service Relevance',
+
+    # Qualification - Headquarters Country
+    'result.qualification.headquarters_country.status': 'HQ Country Status',
+    'result.qualification.headquarters_country.country': 'HQ Country',
+    'result.qualification.headquarters_country.details': 'HQ Country Details',
+
+    # Qualification - Legal Standing
+    'result.qualification.legal_standing.status': 'Legal Status',
+    'result.qualification.legal_standing.details': 'Legal Details',
+    'result.qualification.legal_standing.sources': 'Legal Sources',
+
+    # Qualification - Game Portfolio
+    'result.qualification.game_portfolio.status': 'Game Portfolio Status',
+    'result.qualification.game_portfolio.game_types_found': 'Game Types Found',
+    'result.qualification.game_portfolio.details': 'Game Portfolio Details',
+    'result.qualification.game_portfolio.sources': 'Game Portfolio Sources',
+
+    # Qualification overall
+    'result.qualification.overall_qualified': 'Overall Qualified',
+
+    # Profile - Portfolio Size
+    'result.profile_data.portfolio_size.total_games': 'Total Games',
+    'result.profile_data.portfolio_size.total_games_description': 'Total Games Description',
+    'result.profile_data.portfolio_size.confidence': 'Portfolio Size Confidence',
+    'result.profile_data.portfolio_size.source': 'Portfolio Size Source',
+
+    # Profile - Release Frequency
+    'result.profile_data.release_frequency.games_last_2_years': 'Games Last 2 Years',
+    'result.profile_data.release_frequency.description': 'Release Frequency Description',
+    'result.profile_data.release_frequency.recent_titles': 'Recent Titles',
+    'result.profile_data.release_frequency.confidence': 'Release Frequency Confidence',
+    'result.profile_data.release_frequency.source': 'Release Frequency Source',
+
+    # Profile - Company Size
+    'result.profile_data.company_size.employee_count': 'Employee Count',
+    'result.profile_data.company_size.source': 'Company Size Source',
+
+    # Profile - Revenue
+    'result.profile_data.revenue.amount': 'Revenue Amount',
+    'result.profile_data.revenue.source': 'Revenue Source',
+    'result.profile_data.revenue.details': 'Revenue Details',
+
+    # Profile - External Partnerships
+    'result.profile_data.external_partnerships.works_with_external_studios': 'Works With External Studios',
+    'result.profile_data.external_partnerships.eu_based_studios': 'EU Based Studios',
+    'result.profile_data.external_partnerships.details': 'External Partnerships Details',
+    'result.profile_data.external_partnerships.sources': 'External Partnerships Sources',
+
+    # Profile - Funding
+    'result.profile_data.funding.has_external_funding': 'Has External Funding',
+    'result.profile_data.funding.funding_rounds': 'Funding Rounds',
+    'result.profile_data.funding.public_company': 'Public Company',
+    'result.profile_data.funding.sources': 'Funding Sources',
+
+    # Profile - In-House Creative
+    'result.profile_data.in_house_creative.has_art_team': 'Has Art Team',
+    'result.profile_data.in_house_creative.has_video_production': 'Has Video Production',
+    'result.profile_data.in_house_creative.team_size_estimate': 'Creative Team Size Estimate',
+    'result.profile_data.in_house_creative.likely_needs_external_support': 'Likely Needs External Support',
+    'result.profile_data.in_house_creative.evidence': 'In-House Creative Evidence',
+    'result.profile_data.in_house_creative.sources': 'In-House Creative Sources',
+
+    # Research notes and gaps
+    'result.research_notes': 'Research Notes',
+    'result.data_gaps': 'Data Gaps',
+
+    # Error
+    'error': 'Error',
+}
+
+
+@lru_cache(maxsize=None)
 def make_readable_header(key: str) -> str:
     """Convert dot-notation key to readable header."""
-    header_mapping = {
-        # Meta fields
-        'meta.processed_at': 'Processed At',
-        'meta.model': 'AI Model',
-        'meta.processing_time_sec': 'Processing Time (sec)',
-        'meta.usage.input_tokens': 'Input Tokens',
-        'meta.usage.output_tokens': 'Output Tokens',
-        'meta.usage.cache_read_tokens': 'Cache Read Tokens',
-        'meta.usage.cache_creation_tokens': 'Cache Creation Tokens',
-        'meta.usage.web_search_requests': 'Web Search Requests',
-
-        # Input fields
-        'input.company_name': 'Input Company Name',
-        'input.': 'Input Extra',
-
-        # Result basic fields
-        'result.company_name': 'Company Name',
-        'result.website': 'Website',
-        'result.linkedin_url': 'LinkedIn URL',
-        'result.headquarters_country': 'Headquarters Country',
-        'result.research_date': 'Research Date',
-
-        # Classification
-        'result.company_classification.type': 'Company Type',
-        'result.company_classification.sub_type': 'Company Sub-Type',
-        'result.company_classification.details': 'Classification Details',
-        'result.company_classification.service_relevance': 'Service Relevance',
-
-        # Qualification - Headquarters Country
-        'result.qualification.headquarters_country.status': 'HQ Country Status',
-        'result.qualification.headquarters_country.country': 'HQ Country',
-        'result.qualification.headquarters_country.details': 'HQ Country Details',
-
-        # Qualification - Legal Standing
-        'result.qualification.legal_standing.status': 'Legal Status',
-        'result.qualification.legal_standing.details': 'Legal Details',
-        'result.qualification.legal_standing.sources': 'Legal Sources',
-
-        # Qualification - Game Portfolio
-        'result.qualification.game_portfolio.status': 'Game Portfolio Status',
-        'result.qualification.game_portfolio.game_types_found': 'Game Types Found',
-        'result.qualification.game_portfolio.details': 'Game Portfolio Details',
-        'result.qualification.game_portfolio.sources': 'Game Portfolio Sources',
-
-        # Qualification overall
-        'result.qualification.overall_qualified': 'Overall Qualified',
-
-        # Profile - Portfolio Size
-        'result.profile_data.portfolio_size.total_games': 'Total Games',
-        'result.profile_data.portfolio_size.total_games_description': 'Total Games Description',
-        'result.profile_data.portfolio_size.confidence': 'Portfolio Size Confidence',
-        'result.profile_data.portfolio_size.source': 'Portfolio Size Source',
-
-        # Profile - Release Frequency
-        'result.profile_data.release_frequency.games_last_2_years': 'Games Last 2 Years',
-        'result.profile_data.release_frequency.description': 'Release Frequency Description',
-        'result.profile_data.release_frequency.recent_titles': 'Recent Titles',
-        'result.profile_data.release_frequency.confidence': 'Release Frequency Confidence',
-        'result.profile_data.release_frequency.source': 'Release Frequency Source',
-
-        # Profile - Company Size
-        'result.profile_data.company_size.employee_count': 'Employee Count',
-        'result.profile_data.company_size.source': 'Company Size Source',
-
-        # Profile - Revenue
-        'result.profile_data.revenue.amount': 'Revenue Amount',
-        'result.profile_data.revenue.source': 'Revenue Source',
-        'result.profile_data.revenue.details': 'Revenue Details',
-
-        # Profile - External Partnerships
-        'result.profile_data.external_partnerships.works_with_external_studios': 'Works With External Studios',
-        'result.profile_data.external_partnerships.eu_based_studios': 'EU Based Studios',
-        'result.profile_data.external_partnerships.details': 'External Partnerships Details',
-        'result.profile_data.external_partnerships.sources': 'External Partnerships Sources',
-
-        # Profile - Funding
-        'result.profile_data.funding.has_external_funding': 'Has External Funding',
-        'result.profile_data.funding.funding_rounds': 'Funding Rounds',
-        'result.profile_data.funding.public_company': 'Public Company',
-        'result.profile_data.funding.sources': 'Funding Sources',
-
-        # Profile - In-House Creative
-        'result.profile_data.in_house_creative.has_art_team': 'Has Art Team',
-        'result.profile_data.in_house_creative.has_video_production': 'Has Video Production',
-        'result.profile_data.in_house_creative.team_size_estimate': 'Creative Team Size Estimate',
-        'result.profile_data.in_house_creative.likely_needs_external_support': 'Likely Needs External Support',
-        'result.profile_data.in_house_creative.evidence': 'In-House Creative Evidence',
-        'result.profile_data.in_house_creative.sources': 'In-House Creative Sources',
-
-        # Research notes and gaps
-        'result.research_notes': 'Research Notes',
-        'result.data_gaps': 'Data Gaps',
-
-        # Error
-        'error': 'Error',
-    }
-
-    return header_mapping.get(key, key.replace('.', ' > ').replace('_', ' ').title())
-
-
-def load_json_files(raw_dir: Path) -> list[dict]:
-    """Load all JSON files that don't start with underscore."""
-    records = []
-
-    for filepath in sorted(raw_dir.glob('*.json')):
+    return _HEADER_MAPPING.get(key) or key.replace('.', ' > ').replace('_', ' ').title()
+
+
+def flatten_record(item: tuple[str, dict]) -> dict:
+    """Flatten a (source filename, record) pair, tagging the source file."""
+    source_file, record = item
+    flat = flatten_dict(record)
+    flat['_source_file'] = source_file
+    return flat
+
+
+def _load_record(entry: os.DirEntry) -> tuple[Optional[dict], Optional[str]]:
+    """Load one result file; returns (record, error message)."""
+    try:
+        data = load_json(entry.path)
+    except json.JSONDecodeError as e:
+        return None, f"  Error parsing {entry.name}: {e}"
+    except Exception as e:
+        return None, f"  Error reading {entry.name}: {e}"
+
+    if not isinstance(data, dict):
+        return None, f"  Error reading {entry.name}: expected a JSON object"
+    return data, None
+
+
+def list_json_files(raw_dir: Path) -> list[os.DirEntry]:
+    """List JSON files that don't start with underscore, sorted by name."""
+    # One directory scan; DirEntry carries the name and file type
+    with os.scandir(raw_dir) as it:
+        entries = sorted(
+            (e for e in it if e.name.endswith('.json') and e.is_file()),
+            key=lambda e: e.name,
+        )
+
+    files = []
+    for entry in entries:
         # Skip files starting with underscore
-        if filepath.name.startswith('_'):
-            print(f"  Skipping: {filepath.name}")
+        if entry.name.startswith('_'):
+            print(f"  Skipping: {entry.name}")
             continue
+        files.append(entry)
+    return files
 
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
 
-            # Add source filename
-            data['_source_file'] = filepath.name
-            records.append(data)
+def load_json_files(files: list[os.DirEntry]) -> list[tuple[str, dict]]:
+    """
+    Load the given JSON files.
 
-        except json.JSONDecodeError as e:
-            print(f"  Error parsing {filepath.name}: {e}")
-        except Exception as e:
-            print(f"  Error reading {filepath.name}: {e}")
+    Returns (source filename, record) pairs; records are left unmodified.
+    """
+    # Reads overlap on a thread pool; results come back in file order
+    records = []
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        for entry, (data, error) in zip(files, executor.map(_load_record, files)):
+            if error:
+                print(error)
+            else:
+                records.append((entry.name, data))
 
     return records
 
 
+def _file_signature(entry: os.DirEntry) -> list[int]:
+    """(mtime_ns, size) of a file, used to tell whether it changed."""
+    st = entry.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_flat_cache(cache_file: Path) -> dict:
+    """
+    Load flattened records from a previous run.
+
+    Maps source filename -> [mtime_ns, size, flat record]. A missing or
+    unreadable cache, or one written by another FLAT_CACHE_VERSION, is
+    treated as empty.
+    """
+    try:
+        cache = load_json(cache_file)
+    except Exception as e:
+        print(f"  Ignoring flatten cache {cache_file.name}: {e}")
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != FLAT_CACHE_VERSION:
+        return {}
+    files = cache.get('files')
+    return files if isinstance(files, dict) else {}
+
+
+# Column order: these fields first, then the rest alphabetically
+_PRIORITY = (
+    '_source_file',
+    'result.company_name',
+    'result.website',
+    'result.linkedin_url',
+    'result.headquarters_country',
+    'result.company_classification.type',
+    'result.company_classification.details',
+    'result.qualification.headquarters_country.status',
+    'result.qualification.headquarters_country.country',
+    'result.qualification.headquarters_country.details',
+    'result.qualification.legal_standing.status',
+    'result.qualification.legal_standing.details',
+    'result.qualification.game_portfolio.status',
+    'result.qualification.game_portfolio.details',
+    'result.qualification.game_portfolio.game_types_found',
+    'result.qualification.overall_qualified',
+    'result.profile_data.portfolio_size.total_games',
+    'result.profile_data.portfolio_size.total_games_description',
+    'result.profile_data.release_frequency.games_last_2_years',
+    'result.profile_data.release_frequency.description',
+    'result.profile_data.release_frequency.recent_titles',
+    'result.profile_data.company_size.employee_count',
+    'result.profile_data.revenue.amount',
+    'result.profile_data.revenue.details',
+    'result.profile_data.external_partnerships.works_with_external_studios',
+    'result.profile_data.external_partnerships.eu_based_studios',
+    'result.profile_data.external_partnerships.details',
+    'result.profile_data.funding.has_external_funding',
+    'result.profile_data.funding.funding_rounds',
+    'result.profile_data.funding.public_company',
+    'result.profile_data.in_house_creative.has_art_team',
+    'result.profile_data.in_house_creative.has_video_production',
+    'result.profile_data.in_house_creative.team_size_estimate',
+    'result.profile_data.in_house_creative.evidence',
+)
+_PRIORITY_SET = frozenset(_PRIORITY)
+
+
 def main():
     # Paths
     script_dir = Path(__file__).parent
     raw_dir = script_dir / 'data' / 'raw'
     output_file = script_dir / 'data' / 'output' / 'companies_research.csv'
+    cache_file = output_file.parent / '.flat_cache.json'
 
     # Ensure output directory exists
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"Reading JSON files from: {raw_dir}")
-    records = load_json_files(raw_dir)
-    print(f"Loaded {len(records)} records")
-
-    if not records:
+    files = list_json_files(raw_dir)
+
+    # Files unchanged since the last run reuse their cached flat record
+    cache = load_flat_cache(cache_file)
+    signatures = {entry.name: _file_signature(entry) for entry in files}
+    cached = {}
+    for name, signature in signatures.items():
+        hit = cache.get(name)
+        if hit and hit[:2] == signature:
+            cached[name] = hit[2]
+    stale = [entry for entry in files if entry.name not in cached]
+
+    records = load_json_files(stale)
+    print(f"Loaded {len(records)} changed records, {len(cached)} unchanged from cache")
+
+    # Flatten changed records
+    print("Flattening JSON structures...")
+    flat_by_name = cached
+    flat_by_name.update((item[0], flatten_record(item)) for item in records)
+
+    atomic_write_json(
+        cache_file,
+        {
+            'version': FLAT_CACHE_VERSION,
+            'files': {name: [*signatures[name], flat] for name, flat in flat_by_name.items()},
+        },
+        indent=None,
+    )
+
+    # Back in file order
+    flat_records = [flat_by_name[e.name] for e in files if e.name in flat_by_name]
+    if not flat_records:
         print("No records to process!")
         return
 
-    # Flatten all records
-    print("Flattening JSON structures...")
-    flat_records = []
-    all_keys = set()
-
-    for record in records:
-        flat = flatten_dict(record)
-        flat_records.append(flat)
-        all_keys.update(flat.keys())
-
-    # Define column order (prioritize important fields first)
-    priority_keys = [
-        '_source_file',
-        'result.company_name',
-        'result.website',
-        'result.linkedin_url',
-        'result.headquarters_country',
-        'result.company_classification.type',
-        'result.company_classification.details',
-        'result.qualification.headquarters_country.status',
-        'result.qualification.headquarters_country.country',
-        'result.qualification.headquarters_country.details',
-        'result.qualification.legal_standing.status',
-        'result.qualification.legal_standing.details',
-        'result.qualification.game_portfolio.status',
-        'result.qualification.game_portfolio.details',
-        'result.qualification.game_portfolio.game_types_found',
-        'result.qualification.overall_qualified',
-        'result.profile_data.portfolio_size.total_games',
-        'result.profile_data.portfolio_size.total_games_description',
-        'result.profile_data.release_frequency.games_last_2_years',
-        'result.profile_data.release_frequency.description',
-        'result.profile_data.release_frequency.recent_titles',
-        'result.profile_data.company_size.employee_count',
-        'result.profile_data.revenue.amount',
-        'result.profile_data.revenue.details',
-        'result.profile_data.external_partnerships.works_with_external_studios',
-        'result.profile_data.external_partnerships.eu_based_studios',
-        'result.profile_data.external_partnerships.details',
-        'result.profile_data.funding.has_external_funding',
-        'result.profile_data.funding.funding_rounds',
-        'result.profile_data.funding.public_company',
-        'result.profile_data.in_house_creative.has_art_team',
-        'result.profile_data.in_house_creative.has_video_production',
-        'result.profile_data.in_house_creative.team_size_estimate',
-        'result.profile_data.in_house_creative.evidence',
-    ]
+    all_keys = set().union(*flat_records)
 
     # Order columns: priority first, then alphabetically for the rest
-    ordered_keys = []
-    for key in priority_keys:
-        if key in all_keys:
-            ordered_keys.append(key)
-            all_keys.discard(key)
-
-    # Add remaining keys sorted
-    ordered_keys.extend(sorted(all_keys))
+    ordered_keys = [key for key in _PRIORITY if key in all_keys]
+    ordered_keys.extend(sorted(all_keys - _PRIORITY_SET))
 
     # Create readable headers
     headers = [make_readable_header(key) for key in ordered_keys]
@@ -235,21 +354,10 @@ def main():
     # Write CSV
     print(f"Writing CSV to: {output_file}")
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        row = compile_row_projector(ordered_keys)
         writer = csv.writer(f)
         writer.writerow(headers)
-
-        for flat_record in flat_records:
-            row = []
-            for key in ordered_keys:
-                value = flat_record.get(key, '')
-                # Convert None to empty string
-                if value is None:
-                    value = ''
-                # Convert booleans to readable format
-                elif isinstance(value, bool):
-                    value = 'Yes' if value else 'No'
-                row.append(value)
-            writer.writerow(row)
+        writer.writerows(row(r) for r in flat_records)
 
     print(f"Done! Created CSV with {len(flat_records)} rows and {len(headers)} columns")
     print(f"\nFirst 10 columns:")
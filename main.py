@@ -9,11 +9,19 @@ Two-stage analysis: qualification (Pass/Fail) → detailed profile (qualified on
 import argparse
 import asyncio
 import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Optional
 
-from anthropic import AsyncAnthropic
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:  # optional, httpx needs h2 for HTTP/2
+    HTTP2 = False
 
 from config import Config
 from file_utils import (
@@ -23,22 +31,36 @@ from file_utils import (
     atomic_write_json,
     generate_company_filename,
 )
-from processor import process_company, result_to_dict
+from processor import (
+    ProcessingResult,
+    process_companies_batch,
+    process_company,
+    result_to_dict,
+)
 from rate_limiter import AsyncSlidingWindowRateLimiter, AdaptiveConcurrencyManager
 from aggregator import aggregate_results, print_statistics
 
+# Pending Message Batches job, kept in the raw output dir for resuming
+BATCH_STATE_FILE = "_batch.json"
+
 
 class ProgressTracker:
     """Track and display processing progress."""
 
-    def __init__(self, total: int):
+    # Minimum seconds between progress line refreshes
+    PRINT_INTERVAL = 0.5
+
+    def __init__(self, total: int, show: bool = True):
         self.total = total
+        self.show = show
         self.processed = 0
         self.qualified = 0
         self.failed = 0
         self.errors = 0
         self.total_searches = 0
-        self.start_time = datetime.now(timezone.utc)
+        self.start_time = datetime.now(timezone.utc)  # wall clock, for display/logs
+        self._start_mono = time.monotonic()
+        self._last_print_ts = 0.0
 
     def update(
         self,
@@ -46,7 +68,7 @@ class ProgressTracker:
         searches: int = 0,
         error: bool = False
     ) -> None:
-        """Update progress counters."""
+        """Update progress counters and refresh the progress line."""
         self.processed += 1
         self.total_searches += searches
         if error:
@@ -56,10 +78,20 @@ class ProgressTracker:
         else:
             self.failed += 1
 
+        if not self.show:
+            return
+
+        # Throttle redraws; always draw the final state
+        now = time.monotonic()
+        if now - self._last_print_ts < self.PRINT_INTERVAL and self.processed != self.total:
+            return
+        self._last_print_ts = now
+        print(f"\r{self.get_progress_str()}", end="", flush=True)
+
     def get_progress_str(self) -> str:
         """Get formatted progress string."""
         pct = (self.processed / self.total * 100) if self.total > 0 else 0
-        elapsed = (datetime.now(timezone.utc) - self.start_time).total_seconds()
+        elapsed = time.monotonic() - self._start_mono
 
         # Estimate remaining time
         if self.processed > 0:
@@ -92,6 +124,7 @@ async def process_batch(
     index_manager: IndexManager,
     error_logger: ErrorLogger,
     dry_run: bool = False,
+    use_batch_api: bool = False,
 ) -> None:
     """
     Process a batch of companies concurrently.
@@ -102,13 +135,45 @@ async def process_batch(
         index_manager: Index manager for tracking progress.
         error_logger: Error logger for failures.
         dry_run: If True, don't make API calls.
+        use_batch_api: If True, submit all companies as one Message
+            Batches job instead of individual requests.
     """
     if not companies:
         print("No companies to process.")
         return
 
+    # One pooled HTTP client sized for the worker count, so connections (and
+    # their TLS sessions) are kept alive and reused across requests
+    pool_size = config.max_concurrency * 2
+    client = AsyncAnthropic(
+        api_key=config.api_key,
+        http_client=DefaultAsyncHttpxClient(
+            http2=HTTP2,
+            timeout=httpx.Timeout(config.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=60,
+            ),
+        ),
+    )
+    async with client:
+        await _run_batch(
+            companies, config, client, index_manager, error_logger, dry_run, use_batch_api
+        )
+
+
+async def _run_batch(
+    companies: List[Dict[str, str]],
+    config: Config,
+    client: AsyncAnthropic,
+    index_manager: IndexManager,
+    error_logger: ErrorLogger,
+    dry_run: bool,
+    use_batch_api: bool,
+) -> None:
+    """Run the batch on an open client; see process_batch."""
     system_prompt = config.load_system_prompt()
-    client = AsyncAnthropic(api_key=config.api_key)
 
     rate_limiter = AsyncSlidingWindowRateLimiter(max_rpm=config.web_search_rpm)
     concurrency_manager = AdaptiveConcurrencyManager(
@@ -116,9 +181,7 @@ async def process_batch(
         max_concurrency=config.max_concurrency,
         max_rpm=config.web_search_rpm,
     )
-    semaphore = asyncio.Semaphore(config.initial_concurrency)
-
-    progress = ProgressTracker(len(companies))
+    progress = ProgressTracker(len(companies), show=not dry_run)
 
     print(f"\nStarting processing of {len(companies)} companies...")
     print(f"Model: {config.model}")
@@ -136,20 +199,19 @@ async def process_batch(
             progress.update(qualified=False, searches=0)
             return
 
-        # Dynamically adjust semaphore based on concurrency manager
-        current_limit = await concurrency_manager.get_semaphore_value()
-        # Note: We can't dynamically resize asyncio.Semaphore,
-        # but the rate limiter handles the actual throttling
-
         result = await process_company(
             company=company,
             client=client,
             rate_limiter=rate_limiter,
-            semaphore=semaphore,
             config=config,
             system_prompt=system_prompt,
             concurrency_manager=concurrency_manager,
         )
+        await save_result(company, result)
+
+    async def save_result(company: Dict[str, str], result: ProcessingResult) -> None:
+        """Save a company's result and record it in the index and progress."""
+        company_name = company.get("company_name", "Unknown")
 
         # Save result
         filename = generate_company_filename(
@@ -157,17 +219,18 @@ async def process_batch(
             company.get("website")
         )
         filepath = config.raw_output_dir / f"{filename}.json"
-        atomic_write_json(filepath, result_to_dict(result))
+        # Write on a worker thread so a burst of completions doesn't stall
+        # the event loop on disk I/O
+        await asyncio.to_thread(atomic_write_json, filepath, result_to_dict(result))
 
         # Update index
         index_manager.add(company_name, f"{filename}.json")
 
         # Update progress
-        searches = result.meta.get("usage", {}).get("web_search_requests", 0)
-        is_qualified = (
-            result.result.get("qualification", {}).get("overall_qualified", False)
-            if result.result else False
-        )
+        usage = result.meta.get("usage")
+        searches = usage.get("web_search_requests", 0) if usage else 0
+        qual = result.result.get("qualification") if result.result else None
+        is_qualified = bool(qual and qual.get("overall_qualified"))
 
         if result.success:
             progress.update(qualified=is_qualified, searches=searches)
@@ -180,8 +243,25 @@ async def process_batch(
                 timestamp=result.meta.get("processed_at", ""),
             )
 
-        # Print progress
-        print(f"\r{progress.get_progress_str()}", end="", flush=True)
+    # Batches API: one submission for everything, saved as results arrive
+    if use_batch_api and not dry_run:
+        # A batch left pending by an interrupted run is finished first;
+        # whatever it didn't cover goes out as a new batch
+        state_file = config.raw_output_dir / BATCH_STATE_FILE
+        while companies:
+            resumed = state_file.exists()
+            done = set()
+            async for company, result in process_companies_batch(
+                companies, client, config, system_prompt, state_file=state_file
+            ):
+                await save_result(company, result)
+                done.add(company.get("company_name"))
+            if not resumed:
+                break
+            companies = [c for c in companies if c.get("company_name") not in done]
+        print()  # New line after progress
+        print("\nProcessing complete!")
+        return
 
     # Warm up cache with first request (sequential)
     if companies and not dry_run:
@@ -189,10 +269,33 @@ async def process_batch(
         await process_single(companies[0])
         companies = companies[1:]
 
-    # Process remaining companies concurrently with semaphore limiting
+    async def worker(queue: asyncio.Queue) -> None:
+        """Process companies from the queue until a None sentinel arrives."""
+        while True:
+            company = await queue.get()
+            if company is None:
+                return
+            try:
+                await process_single(company)
+            except Exception as e:
+                print(
+                    f"\nUnexpected error processing {company.get('company_name')}: {e}",
+                    file=sys.stderr,
+                )
+
+    # Process remaining companies with a fixed pool of workers; the bounded
+    # queue keeps only a few pending companies in flight at a time
     if companies:
-        tasks = [process_single(company) for company in companies]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=config.max_concurrency * 2)
+        workers = [
+            asyncio.create_task(worker(queue))
+            for _ in range(config.initial_concurrency)
+        ]
+        for company in companies:
+            await queue.put(company)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
 
     print()  # New line after progress
     print("\nProcessing complete!")
@@ -241,6 +344,13 @@ def parse_args() -> argparse.Namespace:
         help="Simulate processing without making API calls"
     )
 
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit all companies as one Message Batches job (cheaper, but "
+             "results can take up to 24h)"
+    )
+
     parser.add_argument(
         "--concurrency",
         type=int,
@@ -318,6 +428,12 @@ def main() -> int:
         companies = [c for c in companies if c.get("company_name") in company_names]
         print(f"Filtered to {len(companies)} specified companies")
 
+    # Starting fresh also forgets any pending Message Batches job
+    batch_state = config.raw_output_dir / BATCH_STATE_FILE
+    if args.no_resume and not args.dry_run and batch_state.exists():
+        print(f"Ignoring pending batch in {batch_state.name} (--no-resume)")
+        batch_state.unlink()
+
     # Filter out already processed (unless --no-resume)
     if not args.no_resume:
         original_count = len(companies)
@@ -332,14 +448,12 @@ def main() -> int:
         print(f"Test run: processing only {len(companies)} companies")
 
     # Remove duplicates by company_name (keep first occurrence)
-    seen = set()
-    unique_companies = []
+    unique_companies: Dict[str, Dict[str, str]] = {}
     for c in companies:
         name = c.get("company_name")
-        if name and name not in seen:
-            seen.add(name)
-            unique_companies.append(c)
-    companies = unique_companies
+        if name:
+            unique_companies.setdefault(name, c)
+    companies = list(unique_companies.values())
 
     if not companies:
         print("All companies already processed. Use --no-resume to start fresh.")
@@ -356,9 +470,14 @@ def main() -> int:
             index_manager=index_manager,
             error_logger=error_logger,
             dry_run=args.dry_run,
+            use_batch_api=args.batch_api,
         )
     )
 
+    # Fold the append logs back into _index.json / _errors.json
+    index_manager.compact()
+    error_logger.compact()
+
     # Aggregate results
     print("\nAggregating results...")
     stats = aggregate_results(config)
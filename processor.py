@@ -2,17 +2,42 @@
 
 import asyncio
 import json
+import random
 import re
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from anthropic import AsyncAnthropic, APIError, RateLimitError
+from anthropic import AsyncAnthropic, APIError, NotFoundError, RateLimitError
 
 from config import Config
+from file_utils import atomic_write_json, load_json, loads_json
 from rate_limiter import AsyncSlidingWindowRateLimiter, AdaptiveConcurrencyManager
 
+# Trailing comma before } or ]
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+# JavaScript-style comments
+_LINE_COMMENT_RE = re.compile(r'//.*?$', re.MULTILINE)
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+# Opening or closing brace
+_BRACE_RE = re.compile(r'[{}]')
+# JSON inside a markdown code block
+_CODE_FENCE_RE = re.compile(r'```(?:json)?\s*\n([\s\S]*?)\n```')
+
+# Characters of a failed response kept in its result file, for debugging
+RAW_RESPONSE_LIMIT = 5000
+
+# Website prefixes left as-is; mailto: links aren't websites
+_URL_PREFIXES = ("http://", "https://", "mailto:")
+_MAILTO = "mailto:"
+
+# Top-level fields every response must have, in reporting order
+_REQUIRED_TOP = ("company_name", "research_date", "company_classification", "qualification")
+_REQUIRED_TOP_SET = frozenset(_REQUIRED_TOP)
+
 
 @dataclass
 class ProcessingResult:
@@ -39,26 +64,27 @@ def format_company_input(company: Dict[str, str]) -> str:
     """
     parts = [f"## Company to Analyze\n\n**Company Name:** {company['company_name']}"]
 
-    if company.get("website"):
-        website = company["website"]
+    website = company.get("website")
+    if website and not website.startswith(_MAILTO):
         # Clean up website URL
-        if website and not website.startswith(("http://", "https://", "mailto:")):
+        if not website.startswith(_URL_PREFIXES):
             website = f"https://{website}"
-        if website and not website.startswith("mailto:"):
-            parts.append(f"**Website:** {website}")
+        parts.append(f"**Website:** {website}")
 
-    if company.get("linkedin_url"):
-        parts.append(f"**LinkedIn:** {company['linkedin_url']}")
+    linkedin_url = company.get("linkedin_url")
+    if linkedin_url:
+        parts.append(f"**LinkedIn:** {linkedin_url}")
 
     # Add additional context from CSV columns
-    additional = []
-    if company.get("typeOfBusiness"):
-        additional.append(f"Business Type: {company['typeOfBusiness']}")
-    if company.get("sector"):
-        additional.append(f"Sector: {company['sector']}")
-    if company.get("regionsOfOperation"):
-        additional.append(f"Operating Regions: {company['regionsOfOperation']}")
-
+    additional = [
+        f"{label}: {value}"
+        for label, value in (
+            ("Business Type", company.get("typeOfBusiness")),
+            ("Sector", company.get("sector")),
+            ("Operating Regions", company.get("regionsOfOperation")),
+        )
+        if value
+    ]
     if additional:
         parts.append(f"**Additional Context:** {'; '.join(additional)}")
 
@@ -77,10 +103,10 @@ def clean_json_string(json_str: str) -> str:
         Cleaned JSON string.
     """
     # Remove trailing commas before } or ]
-    json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
+    json_str = _TRAILING_COMMA_RE.sub(r'\1', json_str)
     # Remove JavaScript-style comments
-    json_str = re.sub(r'//.*?$', '', json_str, flags=re.MULTILINE)
-    json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
+    json_str = _LINE_COMMENT_RE.sub('', json_str)
+    json_str = _BLOCK_COMMENT_RE.sub('', json_str)
     return json_str
 
 
@@ -102,10 +128,12 @@ def extract_json_from_response(response_text: str) -> Optional[Dict[str, Any]]:
 
     json_str = None
 
-    # Strategy 1: Find JSON in markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*\n([\s\S]*?)\n```', response_text)
-    if json_match:
-        json_str = json_match.group(1).strip()
+    # Strategy 1: Find JSON in markdown code blocks (skip the regex scan
+    # when there is no fence at all)
+    if '```' in response_text:
+        json_match = _CODE_FENCE_RE.search(response_text)
+        if json_match:
+            json_str = json_match.group(1).strip()
 
     # Strategy 2: Find JSON object starting with { and ending with }
     if not json_str:
@@ -118,13 +146,17 @@ def extract_json_from_response(response_text: str) -> Optional[Dict[str, Any]]:
     if not json_str:
         return None
 
-    # Try parsing with cleaning
-    for attempt_clean in [False, True]:
+    try:
+        return loads_json(json_str)
+    except json.JSONDecodeError:
+        pass
+
+    # Retry with cleaning, only if there is something to clean
+    if '//' in json_str or '/*' in json_str or _TRAILING_COMMA_RE.search(json_str):
         try:
-            text_to_parse = clean_json_string(json_str) if attempt_clean else json_str
-            return json.loads(text_to_parse)
+            return loads_json(clean_json_string(json_str))
         except json.JSONDecodeError:
-            continue
+            pass
 
     # Strategy 3: Try to find balanced braces
     try:
@@ -132,16 +164,17 @@ def extract_json_from_response(response_text: str) -> Optional[Dict[str, Any]]:
         if first_brace != -1:
             depth = 0
             end_pos = first_brace
-            for i, char in enumerate(json_str[first_brace:], first_brace):
-                if char == '{':
+            # Step from brace to brace; the regex skips everything else in C
+            for m in _BRACE_RE.finditer(json_str, first_brace):
+                if m.group() == '{':
                     depth += 1
-                elif char == '}':
+                else:
                     depth -= 1
                     if depth == 0:
-                        end_pos = i
+                        end_pos = m.start()
                         break
             balanced_json = json_str[first_brace:end_pos + 1]
-            return json.loads(clean_json_string(balanced_json))
+            return loads_json(clean_json_string(balanced_json))
     except json.JSONDecodeError:
         pass
 
@@ -158,27 +191,34 @@ def validate_response(response: Dict[str, Any]) -> Tuple[bool, List[str]]:
     Returns:
         Tuple of (is_valid, list of errors).
     """
-    errors = []
+    classification = response.get("company_classification") or {}
+    qual = response.get("qualification") or {}
+    qualified = qual.get("overall_qualified")
+
+    # Common case: everything present, nothing to report
+    if (
+        _REQUIRED_TOP_SET.issubset(response)
+        and "type" in classification
+        and qualified is not None
+        and (not qualified or "profile_data" in response)
+    ):
+        return True, []
 
     # Required top-level fields
-    required_top = ["company_name", "research_date", "company_classification", "qualification"]
-    for field_name in required_top:
-        if field_name not in response:
-            errors.append(f"Missing required field: {field_name}")
+    missing = _REQUIRED_TOP_SET.difference(response)
+    errors = [f"Missing required field: {name}" for name in _REQUIRED_TOP if name in missing]
 
     # Check company_classification structure
-    classification = response.get("company_classification", {})
     if "type" not in classification:
         errors.append("Missing company_classification.type")
 
     # Check qualification structure
-    qual = response.get("qualification", {})
     if "overall_qualified" not in qual:
         errors.append("Missing qualification.overall_qualified")
 
     # If qualified=True, must have profile_data (unless NOT_RELEVANT)
     is_not_relevant = classification.get("type") == "NOT_RELEVANT"
-    if qual.get("overall_qualified") and "profile_data" not in response and not is_not_relevant:
+    if qualified and "profile_data" not in response and not is_not_relevant:
         errors.append("Qualified company missing profile_data")
 
     return len(errors) == 0, errors
@@ -195,11 +235,7 @@ def get_response_text(response) -> str:
     We concatenate all text blocks to capture the full response,
     including the final JSON output that comes after searches.
     """
-    text_parts = []
-    for block in response.content:
-        if block.type == "text":
-            text_parts.append(block.text)
-    return "\n".join(text_parts)
+    return "\n".join(block.text for block in response.content if block.type == "text")
 
 
 def get_usage_stats(response) -> Dict[str, int]:
@@ -222,6 +258,57 @@ def get_usage_stats(response) -> Dict[str, int]:
     return stats
 
 
+def build_request_params(
+    messages: List[Dict],
+    config: Config,
+    system_prompt: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build messages.create parameters, with the system prompt cached.
+
+    Args:
+        messages: Messages to send.
+        config: Configuration object.
+        system_prompt: Optional system prompt text.
+
+    Returns:
+        Keyword arguments for messages.create (or a batch request's params).
+    """
+    params = {
+        "model": config.model,
+        "max_tokens": config.max_tokens,
+        "tools": config.tools,
+        "messages": messages,
+    }
+    if system_prompt:
+        params["system"] = [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ]
+    return params
+
+
+def _retry_wait(error: APIError, attempt: int, config: Config) -> float:
+    """
+    Seconds to wait before retrying a failed call.
+
+    Uses "full jitter" exponential backoff, so workers that failed together
+    don't all retry at the same moment, and never waits less than the
+    server's Retry-After header asks for.
+    """
+    wait_time = random.uniform(0, min(config.base_delay * (2 ** attempt), config.max_delay))
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            wait_time = max(wait_time, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return wait_time
+
+
 async def call_api_with_retry(
     client: AsyncAnthropic,
     messages: List[Dict],
@@ -246,47 +333,25 @@ async def call_api_with_retry(
         APIError: If all retries exhausted.
     """
     retries = max_retries or config.max_retries
-    delay = config.base_delay
-
-    # Build system parameter with cache control if provided
-    system = None
-    if system_prompt:
-        system = [
-            {
-                "type": "text",
-                "text": system_prompt,
-                "cache_control": {"type": "ephemeral"}
-            }
-        ]
+    create_kwargs = build_request_params(messages, config, system_prompt)
 
     for attempt in range(retries):
         try:
-            create_kwargs = {
-                "model": config.model,
-                "max_tokens": config.max_tokens,
-                "tools": config.tools,
-                "messages": messages,
-            }
-            if system:
-                create_kwargs["system"] = system
-
             response = await client.messages.create(**create_kwargs)
             return response
 
         except RateLimitError as e:
             if attempt == retries - 1:
                 raise
-            # Use longer delay for rate limits
-            wait_time = min(delay * (2 ** attempt), config.max_delay)
-            await asyncio.sleep(wait_time)
+            await asyncio.sleep(_retry_wait(e, attempt, config))
 
         except APIError as e:
             if attempt == retries - 1:
                 raise
             # Check if retryable
-            if e.status_code in (500, 502, 503, 529):
-                wait_time = min(delay * (2 ** attempt), config.max_delay)
-                await asyncio.sleep(wait_time)
+            # Connection errors and timeouts carry no status code
+            if getattr(e, "status_code", None) in (500, 502, 503, 529):
+                await asyncio.sleep(_retry_wait(e, attempt, config))
             else:
                 raise
 
@@ -298,6 +363,7 @@ async def retry_for_valid_json(
     config: Config,
     system_prompt: str,
     original_response: str,
+    user_content: Optional[str] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Retry API call to get valid JSON.
@@ -309,6 +375,7 @@ async def retry_for_valid_json(
         config: Configuration object.
         system_prompt: System prompt text.
         original_response: Original invalid response.
+        user_content: The original user message, if already formatted.
 
     Returns:
         Valid JSON dict or None.
@@ -331,7 +398,7 @@ IMPORTANT: Return ONLY the raw JSON object for {company['company_name']}.
     messages = [
         {
             "role": "user",
-            "content": format_company_input(company)
+            "content": user_content or format_company_input(company)
         },
         {
             "role": "assistant",
@@ -351,14 +418,134 @@ IMPORTANT: Return ONLY the raw JSON object for {company['company_name']}.
         return None
 
 
+# Last UTC timestamp handed out by _now_iso, and when it was taken
+_now_cache: Tuple[float, str] = (float("-inf"), "")
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, reused for up to a second."""
+    global _now_cache
+    now = time.monotonic()
+    taken_at, stamp = _now_cache
+    if now - taken_at >= 1.0:
+        stamp = datetime.now(timezone.utc).isoformat()
+        _now_cache = (now, stamp)
+    return stamp
+
+
+def _parse_and_validate(
+    response_text: str,
+) -> Tuple[Optional[Dict[str, Any]], bool, List[str]]:
+    """Extract JSON from a response and validate it; (json, is_valid, errors)."""
+    result_json = extract_json_from_response(response_text)
+    if not result_json:
+        return None, False, []
+    is_valid, errors = validate_response(result_json)
+    return result_json, is_valid, errors
+
+
+def _error_result(
+    company: Dict[str, str],
+    config: Config,
+    start_time: float,
+    error: str,
+) -> ProcessingResult:
+    """Build the result for a company whose request failed outright."""
+    return ProcessingResult(
+        success=False,
+        company_name=company.get("company_name", "Unknown"),
+        meta={
+            "processed_at": _now_iso(),
+            "model": config.model,
+            "processing_time_sec": round(time.time() - start_time, 2),
+        },
+        input_data=company,
+        error=error,
+    )
+
+
+async def _result_from_response(
+    company: Dict[str, str],
+    response: Any,
+    usage_stats: Dict[str, int],
+    client: AsyncAnthropic,
+    config: Config,
+    system_prompt: str,
+    user_content: str,
+    start_time: float,
+) -> ProcessingResult:
+    """
+    Parse and validate a model response into a ProcessingResult.
+
+    Unparseable or invalid JSON is retried through the live API.
+    """
+    company_name = company.get("company_name", "Unknown")
+
+    # Extract, parse and validate on a worker thread, off the event loop
+    response_text = get_response_text(response)
+    result_json, is_valid, errors = await asyncio.to_thread(
+        _parse_and_validate, response_text
+    )
+
+    # If JSON extraction failed completely, try retry
+    if not result_json and response_text:
+        result_json = await retry_for_valid_json(
+            client, company,
+            ["Could not extract JSON from response"],
+            config, system_prompt, response_text, user_content
+        )
+        if result_json:
+            is_valid, errors = validate_response(result_json)
+
+    # Try to fix JSON with validation errors
+    if result_json and not is_valid:
+        fixed_json = await retry_for_valid_json(
+            client, company, errors, config, system_prompt, response_text,
+            user_content,
+        )
+        if fixed_json:
+            result_json = fixed_json
+
+    processing_time = time.time() - start_time
+
+    if not result_json:
+        return ProcessingResult(
+            success=False,
+            company_name=company_name,
+            meta={
+                "processed_at": _now_iso(),
+                "model": config.model,
+                "processing_time_sec": round(processing_time, 2),
+                "usage": usage_stats,
+            },
+            input_data=company,
+            error="Failed to extract valid JSON from response",
+            # Slicing a str no longer than the limit returns it uncopied
+            raw_response=response_text[:RAW_RESPONSE_LIMIT] if response_text else None,
+        )
+
+    return ProcessingResult(
+        success=True,
+        company_name=company_name,
+        meta={
+            "processed_at": _now_iso(),
+            "model": config.model,
+            "processing_time_sec": round(processing_time, 2),
+            "usage": usage_stats,
+        },
+        input_data=company,
+        result=result_json,
+    )
+
+
 async def process_company(
     company: Dict[str, str],
     client: AsyncAnthropic,
     rate_limiter: AsyncSlidingWindowRateLimiter,
-    semaphore: asyncio.Semaphore,
     config: Config,
     system_prompt: str,
     concurrency_manager: Optional[AdaptiveConcurrencyManager] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
 ) -> ProcessingResult:
     """
     Process a single company through the analysis pipeline.
@@ -367,17 +554,16 @@ async def process_company(
         company: Company data from CSV.
         client: Anthropic async client.
         rate_limiter: Rate limiter for web search.
-        semaphore: Concurrency semaphore.
         config: Configuration object.
         system_prompt: System prompt text.
         concurrency_manager: Optional adaptive concurrency manager.
+        semaphore: Optional concurrency semaphore, for callers that don't
+            bound concurrency themselves.
 
     Returns:
         ProcessingResult with success/failure and data.
     """
-    company_name = company.get("company_name", "Unknown")
-
-    async with semaphore:
+    async with semaphore or nullcontext():
         start_time = time.time()
 
         try:
@@ -385,9 +571,10 @@ async def process_company(
             await rate_limiter.acquire(estimated_searches=7)
 
             # Build message with company data only (system prompt passed separately for caching)
+            user_content = format_company_input(company)
             messages = [{
                 "role": "user",
-                "content": format_company_input(company)
+                "content": user_content
             }]
 
             # Call API with system prompt as separate parameter for proper caching
@@ -402,72 +589,117 @@ async def process_company(
             if concurrency_manager:
                 await concurrency_manager.record_searches(web_searches)
 
-            # Extract and parse response
-            response_text = get_response_text(response)
-            result_json = extract_json_from_response(response_text)
-
-            # If JSON extraction failed completely, try retry
-            if not result_json and response_text:
-                result_json = await retry_for_valid_json(
-                    client, company,
-                    ["Could not extract JSON from response"],
-                    config, system_prompt, response_text
-                )
-
-            # Validate response
-            if result_json:
-                is_valid, errors = validate_response(result_json)
-                if not is_valid:
-                    # Try to fix JSON with validation errors
-                    fixed_json = await retry_for_valid_json(
-                        client, company, errors, config, system_prompt, response_text
-                    )
-                    if fixed_json:
-                        result_json = fixed_json
-
-            processing_time = time.time() - start_time
-
-            if not result_json:
-                return ProcessingResult(
-                    success=False,
-                    company_name=company_name,
-                    meta={
-                        "processed_at": datetime.now(timezone.utc).isoformat(),
-                        "model": config.model,
-                        "processing_time_sec": round(processing_time, 2),
-                        "usage": usage_stats,
-                    },
-                    input_data=company,
-                    error="Failed to extract valid JSON from response",
-                    raw_response=response_text[:5000] if response_text else None,  # Truncate for storage
-                )
-
-            return ProcessingResult(
-                success=True,
-                company_name=company_name,
-                meta={
-                    "processed_at": datetime.now(timezone.utc).isoformat(),
-                    "model": config.model,
-                    "processing_time_sec": round(processing_time, 2),
-                    "usage": usage_stats,
-                },
-                input_data=company,
-                result=result_json,
+            return await _result_from_response(
+                company, response, usage_stats, client, config,
+                system_prompt, user_content, start_time,
             )
 
         except Exception as e:
-            processing_time = time.time() - start_time
-            return ProcessingResult(
-                success=False,
-                company_name=company_name,
-                meta={
-                    "processed_at": datetime.now(timezone.utc).isoformat(),
-                    "model": config.model,
-                    "processing_time_sec": round(processing_time, 2),
-                },
-                input_data=company,
-                error=str(e),
+            return _error_result(company, config, start_time, str(e))
+
+
+async def process_companies_batch(
+    companies: List[Dict[str, str]],
+    client: AsyncAnthropic,
+    config: Config,
+    system_prompt: str,
+    state_file: Optional[Path] = None,
+    poll_interval: float = 30.0,
+) -> AsyncIterator[Tuple[Dict[str, str], ProcessingResult]]:
+    """
+    Process companies through one Message Batches API job.
+
+    All requests go out in a single submission and are billed at the
+    batch rate; the batch is polled until it ends. Responses go through
+    the same parsing and validation as process_company, and only items
+    that need a JSON retry fall back to the live API.
+
+    The batch id and its companies are saved to state_file once the batch
+    is created. If that file already exists, the saved batch is resumed
+    instead of submitting (and paying for) a new one; the file is removed
+    once all of its results have been yielded.
+
+    Args:
+        companies: Company data from CSV.
+        client: Anthropic async client.
+        config: Configuration object.
+        system_prompt: System prompt text.
+        state_file: Where to save the pending batch, for resuming.
+        poll_interval: Seconds between batch status checks.
+
+    Yields:
+        (company, ProcessingResult) pairs, in completion order.
+    """
+    start_time = time.time()
+    saved = load_json(state_file) if state_file else None
+    batch = None
+
+    if saved:
+        try:
+            batch = await client.messages.batches.retrieve(saved["batch_id"])
+        except NotFoundError:
+            # Expired, deleted, or created under another key/workspace
+            print(f"Saved Message Batches job {saved['batch_id']} no longer exists; "
+                  "submitting a new one")
+            state_file.unlink(missing_ok=True)
+
+    if batch is not None:
+        # Custom ids index into the companies the batch was created with
+        companies = saved["companies"]
+        user_contents = [format_company_input(c) for c in companies]
+        print(f"Resuming Message Batches job {batch.id} ({len(companies)} companies)")
+    else:
+        user_contents = [format_company_input(c) for c in companies]
+        batch = await client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": f"company-{i}",
+                    "params": build_request_params(
+                        [{"role": "user", "content": content}], config, system_prompt
+                    ),
+                }
+                for i, content in enumerate(user_contents)
+            ]
+        )
+        print(f"Submitted Message Batches job {batch.id} ({len(companies)} companies)")
+        if state_file:
+            atomic_write_json(state_file, {"batch_id": batch.id, "companies": companies})
+
+    while batch.processing_status != "ended":
+        await asyncio.sleep(poll_interval)
+        batch = await client.messages.batches.retrieve(batch.id)
+
+    pending = set(range(len(companies)))
+    async for entry in await client.messages.batches.results(batch.id):
+        i = int(entry.custom_id.rpartition("-")[2])
+        pending.discard(i)
+        company = companies[i]
+
+        if entry.result.type != "succeeded":
+            error = getattr(entry.result, "error", None)
+            message = f"Batch request {entry.result.type}"
+            if error is not None:
+                message += f": {error}"
+            yield company, _error_result(company, config, start_time, message)
+            continue
+
+        response = entry.result.message
+        try:
+            result = await _result_from_response(
+                company, response, get_usage_stats(response), client, config,
+                system_prompt, user_contents[i], start_time,
             )
+        except Exception as e:
+            result = _error_result(company, config, start_time, str(e))
+        yield company, result
+
+    for i in sorted(pending):
+        yield companies[i], _error_result(
+            companies[i], config, start_time, "Missing from batch results"
+        )
+
+    if state_file:
+        state_file.unlink(missing_ok=True)
 
 
 def result_to_dict(result: ProcessingResult) -> Dict[str, Any]:
@@ -1,6 +1,7 @@
 """Async sliding window rate limiter for web search API calls."""
 
 import asyncio
+import random
 import time
 from collections import deque
 from dataclasses import dataclass, field
@@ -30,35 +31,44 @@ class AsyncSlidingWindowRateLimiter:
     max_rpm: int = 30
     window_seconds: float = 60.0
     _requests: Deque[Tuple[float, int]] = field(default_factory=deque)
-    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    _cond: asyncio.Condition = field(default_factory=asyncio.Condition)
     _total_requests: int = 0
     _total_searches: int = 0
+    _window_searches: int = 0  # running sum of searches in _requests
 
     async def acquire(self, estimated_searches: int = 5) -> None:
         """
         Wait until we can make a request with estimated searches.
 
+        Waiters release the lock while waiting and are woken either when
+        another waiter frees capacity or when the oldest request leaves
+        the window, with jitter so they don't all retry at once.
+
         Args:
             estimated_searches: Expected number of web searches for this request.
         """
-        async with self._lock:
+        async with self._cond:
             while True:
-                self._cleanup_old_requests()
-
-                current_searches = sum(s for _, s in self._requests)
+                if self._cleanup_old_requests():
+                    self._cond.notify_all()
 
                 # Check if we have room for estimated searches
-                if current_searches + estimated_searches <= self.max_rpm:
+                if self._window_searches + estimated_searches <= self.max_rpm:
                     break
 
                 # Calculate wait time
                 if self._requests:
                     oldest_time, _ = self._requests[0]
                     wait_time = oldest_time + self.window_seconds - time.monotonic()
-                    if wait_time > 0:
-                        await asyncio.sleep(wait_time + 0.1)
                 else:
-                    await asyncio.sleep(0.1)
+                    wait_time = 0.0
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait(),
+                        max(wait_time, 0.0) + random.uniform(0.1, 0.2),
+                    )
+                except asyncio.TimeoutError:
+                    pass
 
     async def consume(self, actual_searches: int) -> None:
         """
@@ -67,30 +77,32 @@ class AsyncSlidingWindowRateLimiter:
         Args:
             actual_searches: Number of web searches from usage.server_tool_use.
         """
-        async with self._lock:
-            now = time.monotonic()
-            self._requests.append((now, actual_searches))
-            self._total_requests += 1
-            self._total_searches += actual_searches
-
-    def _cleanup_old_requests(self) -> None:
-        """Remove requests older than the window."""
+        # Nothing here awaits, so the updates can't interleave with another
+        # coroutine and need no lock
+        self._requests.append((time.monotonic(), actual_searches))
+        self._total_requests += 1
+        self._total_searches += actual_searches
+        self._window_searches += actual_searches
+
+    def _cleanup_old_requests(self) -> bool:
+        """Remove requests older than the window; returns whether any were."""
         cutoff = time.monotonic() - self.window_seconds
+        removed = False
         while self._requests and self._requests[0][0] < cutoff:
-            self._requests.popleft()
+            self._window_searches -= self._requests.popleft()[1]
+            removed = True
+        return removed
 
     async def get_stats(self) -> RateLimiterStats:
         """Get current rate limiter statistics."""
-        async with self._lock:
+        async with self._cond:
             self._cleanup_old_requests()
 
-            window_searches = sum(s for _, s in self._requests)
-
             return RateLimiterStats(
                 total_requests=self._total_requests,
                 total_searches=self._total_searches,
                 window_requests=len(self._requests),
-                current_rpm=window_searches,
+                current_rpm=self._window_searches,
                 avg_searches_per_request=(
                     self._total_searches / self._total_requests
                     if self._total_requests > 0 else 0.0
@@ -99,9 +111,10 @@ class AsyncSlidingWindowRateLimiter:
 
     async def get_current_usage(self) -> int:
         """Get current searches in the sliding window."""
-        async with self._lock:
-            self._cleanup_old_requests()
-            return sum(s for _, s in self._requests)
+        # No await between cleanup and read, so no lock is needed; taking
+        # it would wait out any acquire() sleeping on the limit
+        self._cleanup_old_requests()
+        return self._window_searches
 
 
 class AdaptiveConcurrencyManager:
@@ -124,11 +137,17 @@ class AdaptiveConcurrencyManager:
         self.max_rpm = max_rpm
         self._lock = asyncio.Lock()
         self._recent_searches: Deque[int] = deque(maxlen=20)
+        self._recent_sum = 0  # running sum of _recent_searches
 
     async def record_searches(self, searches: int) -> None:
         """Record searches used by a company."""
         async with self._lock:
-            self._recent_searches.append(searches)
+            recent = self._recent_searches
+            if len(recent) == recent.maxlen:
+                # append() is about to evict the oldest entry
+                self._recent_sum -= recent[0]
+            recent.append(searches)
+            self._recent_sum += searches
             self._adjust_concurrency()
 
     def _adjust_concurrency(self) -> None:
@@ -136,7 +155,7 @@ class AdaptiveConcurrencyManager:
         if len(self._recent_searches) < 5:
             return  # Not enough data
 
-        avg_searches = sum(self._recent_searches) / len(self._recent_searches)
+        avg_searches = self._recent_sum / len(self._recent_searches)
 
         # Calculate optimal concurrency
         # max_rpm / avg_searches = max parallel requests